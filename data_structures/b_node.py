@@ -1,13 +1,33 @@
-from enum import Enum
+from functools import lru_cache
+import bisect
 import struct
+import zlib
 
-class NodeType(Enum):
-    INTERNAL = 1
-    LEAF = 2
+# Node types, as stored in the 'btype' header field
+NODE_INTERNAL = 1
+NODE_LEAF = 2
+
+@lru_cache(maxsize=None)
+def _u16_array(count: int) -> struct.Struct:
+    """Returns a precompiled struct for 'count' consecutive little-endian u16s."""
+    return struct.Struct(f'<{count}H')
+
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    """Returns the length of the longest common prefix of two byte strings."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
 
 class BNode:
     """Represents a B-tree node with efficient encoding/decoding logic for KV pairs."""
 
+    __slots__ = (
+        '_data', '_mv', '_lookup_fn', '_cache_nkeys', '_ptr_end', '_kv_base',
+        '_lookup_page', '_pooled',
+    )
+
     HEADER_SIZE = 4
     POINTER_SIZE = 8
     FLAG_SIZE = 2
@@ -15,6 +35,14 @@ class BNode:
     MAX_KEY_SIZE = 1000
     MAX_VAL_SIZE = 3000
     PAGE_SIZE = 4096
+    CHECKSUM_OFFSET = PAGE_SIZE - CHECKSUM_SIZE  # CRC32 occupies the last bytes of the page
+    LOOKUP_COMPILE_THRESHOLD = 16
+
+    _U16 = struct.Struct('<H')
+    _U32 = struct.Struct('<I')
+    _U64 = struct.Struct('<Q')
+    _U16U16 = struct.Struct('<HH')
+    _HEADER = _U16U16  # (btype, nkeys)
 
     def __init__(self):
         """Initialize a BNode with a fixed PAGE_SIZE bytearray."""
@@ -27,159 +55,340 @@ class BNode:
             self.MAX_VAL_SIZE
         )
         assert total_size <= self.PAGE_SIZE, "Node size exceeds page size limit!"
+        self._pooled = False
+        self._ptr_end = 0
+        self._kv_base = 0
         self.data = bytearray(self.PAGE_SIZE)
 
+    @property
+    def data(self) -> bytearray:
+        """The node's PAGE_SIZE page buffer."""
+        return self._data
+
+    @data.setter
+    def data(self, page: bytearray) -> None:
+        """Installs a new page buffer, e.g. one a loader has just read."""
+        self._data = page
+        self._mv = memoryview(page)
+        self._cache_nkeys = -1
+        self._invalidate()
+
+    # === POOLING ===
+    @classmethod
+    def acquire(cls, zero_fill: bool = True) -> 'BNode':
+        """Returns a node, reusing a released one when available.
+
+        Pass zero_fill=False when the caller writes everything up to get_data_end();
+        a reused page then keeps stale bytes past that point, which are never read.
+        """
+        if not _NODE_POOL:
+            return cls()
+
+        node = _NODE_POOL.pop()
+        node._pooled = False
+        if zero_fill:
+            node._data[:] = _ZERO_PAGE
+        node._invalidate()
+        return node
+
+    def release(self) -> None:
+        """Returns the node to the pool. The node must not be used afterwards.
+
+        Views returned by get_key()/get_value() alias the page and will silently
+        change once the node is reacquired; copy them with bytes() first.
+        """
+        assert not self._pooled, "Node was already released."
+        if self._pooled:
+            return
+
+        self._pooled = True
+        if len(_NODE_POOL) < _NODE_POOL_LIMIT:
+            _NODE_POOL.append(self)
+
     # === NODE TYPE CHECKS ===
     def is_leaf(self) -> bool:
         """Returns True if the node is a leaf."""
-        return self.get_node_type() == NodeType.LEAF
+        return BNode._U16.unpack_from(self._data, 0)[0] == NODE_LEAF
 
     def is_internal(self) -> bool:
         """Returns True if the node is an internal node."""
-        return self.get_node_type() == NodeType.INTERNAL
+        return BNode._U16.unpack_from(self._data, 0)[0] == NODE_INTERNAL
 
     # === METADATA ===
     def get_node_type(self) -> int:
         """Extracts the 2-byte 'btype' field from the node's data."""
-        return struct.unpack_from('<H', self.data, 0)[0]  # Little-endian Uint16 at position 0
+        return BNode._U16.unpack_from(self._data, 0)[0]  # Little-endian Uint16 at position 0
 
     def get_num_keys(self) -> int:
         """Extracts the 2-byte 'nkeys' field from the node's data starting at byte 2."""
-        return struct.unpack_from('<H', self.data, 2)[0]
+        return BNode._U16.unpack_from(self._data, 2)[0]
+
+    def get_header(self) -> tuple:
+        """Extracts the ('btype', 'nkeys') header fields in a single read."""
+        return BNode._HEADER.unpack_from(self._data, 0)
 
     def write_metadata(self, node_type: int, num_keys: int) -> None:
         """Writes 'node_type' and 'nkeys' back into the node's data buffer."""
-        struct.pack_into('<H', self.data, 0, node_type)
-        struct.pack_into('<H', self.data, 2, num_keys)
+        self._invalidate()
+        BNode._HEADER.pack_into(self._data, 0, node_type, num_keys)
+
+    def _refresh_layout(self) -> int:
+        """Recomputes the cached offset-table and KV bases if 'nkeys' changed; returns 'nkeys'."""
+        num_keys = BNode._U16.unpack_from(self._data, 2)[0]
+        if num_keys != self._cache_nkeys:
+            self._cache_nkeys = num_keys
+            self._ptr_end = self.HEADER_SIZE + (num_keys * self.POINTER_SIZE)
+            self._kv_base = self._ptr_end + (2 * num_keys)
+        return num_keys
+
+    # === CHECKSUM ===
+    def compute_checksum(self) -> int:
+        """Computes the CRC32 of the page, excluding the checksum field itself."""
+        return zlib.crc32(self._mv[:self.CHECKSUM_OFFSET])
+
+    def update_checksum(self) -> None:
+        """Stores the page's CRC32 in its checksum field."""
+        assert self.get_data_end() <= self.CHECKSUM_OFFSET, "KV data overlaps the checksum field."
+        BNode._U32.pack_into(self._data, self.CHECKSUM_OFFSET, self.compute_checksum())
+
+    def verify_checksum(self) -> bool:
+        """Returns True if the stored checksum matches the page contents."""
+        return BNode._U32.unpack_from(self._data, self.CHECKSUM_OFFSET)[0] == self.compute_checksum()
+
+    # === LOOKUP SPECIALIZATION ===
+    def _decode_keys(self) -> list:
+        """Unpacks all keys into a list of owned bytes, reading the offset table in one call."""
+        n_keys = self._refresh_layout()
+        data = self._data
+        offsets = (0,) + _u16_array(n_keys).unpack_from(data, self._ptr_end)
+
+        keys = []
+        for offset in offsets[:-1]:
+            pos = self._kv_base + offset
+            key_length = BNode._U16.unpack_from(data, pos)[0]
+            keys.append(bytes(data[pos + 4 : pos + 4 + key_length]))
+        return keys
+
+    def _invalidate(self) -> None:
+        """Drops the specialized lookup after the page is modified."""
+        self._lookup_fn = None
+        self._lookup_page = None
 
     # === POINTERS ===
     def get_pointer(self, idx: int) -> int:
         """Retrieves a pointer (uint64) from the node's data."""
         assert idx < self.get_num_keys(), "Pointer index out of range."
         pos = self.HEADER_SIZE + (self.POINTER_SIZE * idx)
-        return struct.unpack_from('<Q', self.data, pos)[0]
+        return BNode._U64.unpack_from(self._data, pos)[0]
 
     def set_pointer(self, idx: int, val: int) -> None:
         """Sets a pointer (uint64) in the node's data."""
         assert idx < self.get_num_keys(), "Pointer index out of range."
+        self._invalidate()
         pos = self.HEADER_SIZE + (self.POINTER_SIZE * idx)
-        struct.pack_into('<Q', self.data, pos, val)
+        BNode._U64.pack_into(self._data, pos, val)
 
     # === OFFSET LIST ===
+    # Offsets are u16s relative to the start of the KV area. Offset 0 is implicit, so
+    # entry idx (1..nkeys) lives 2 * (idx - 1) bytes past the end of the pointer band.
     def get_offset_position(self, idx: int) -> int:
         """Calculates the position of the idx-th offset in the byte array."""
-        num_keys = self.get_num_keys()
-        pos = self.HEADER_SIZE + (num_keys * self.POINTER_SIZE) + 2 * (idx - 1)
-        return pos
+        self._refresh_layout()
+        return self._ptr_end + 2 * (idx - 1)
 
     def get_offset(self, idx: int) -> int:
         """Retrieves the offset for the idx-th KV pair."""
-        assert idx > 0, "Offset index must be greater than zero."
-        return struct.unpack_from('<H', self.data, self.get_offset_position(idx))[0]
+        if idx == 0:
+            return 0  # The first KV pair always starts at offset 0 and is not stored
+        return BNode._U16.unpack_from(self._data, self.get_offset_position(idx))[0]
 
     def set_offset(self, idx: int, offset: int) -> None:
         """Sets the offset for the idx-th KV pair."""
+        self._invalidate()
         pos = self.get_offset_position(idx)
-        struct.pack_into('<H', self.data, pos, offset)
+        BNode._U16.pack_into(self._data, pos, offset)
 
     # === KV PAIR MANAGEMENT ===
     def get_kv_start(self, idx: int) -> int:
         """Calculates the starting position of the idx-th KV pair."""
-        num_keys = self.get_num_keys()
+        num_keys = self._refresh_layout()
         assert idx <= num_keys, "KV index out of range."
-        return self.HEADER_SIZE + (num_keys * self.POINTER_SIZE) + (2 * num_keys) + self.get_offset(idx)
 
-    def get_key(self, idx: int) -> bytes:
-        """Retrieves the key from the idx-th KV pair."""
+        if idx == 0:
+            return self._kv_base
+        return self._kv_base + BNode._U16.unpack_from(self._data, self._ptr_end + 2 * (idx - 1))[0]
+
+    def get_key(self, idx: int) -> memoryview:
+        """Retrieves a view of the key in the idx-th KV pair; use bytes() to keep an owned copy."""
         assert idx < self.get_num_keys(), "Invalid key index."
 
         pos = self.get_kv_start(idx)
-        key_length = struct.unpack_from('<H', self.data, pos)[0]
+        key_length = BNode._U16.unpack_from(self._data, pos)[0]
 
-        return self.data[pos + 4 : pos + 4 + key_length]
+        return self._mv[pos + 4 : pos + 4 + key_length]
 
-    def get_value(self, idx: int) -> bytes:
-        """Retrieves the value from the idx-th KV pair."""
+    def get_value(self, idx: int) -> memoryview:
+        """Retrieves a view of the value in the idx-th KV pair; use bytes() to keep an owned copy."""
         assert idx < self.get_num_keys(), "Invalid value index."
 
         pos = self.get_kv_start(idx)
-        key_length = struct.unpack_from('<H', self.data, pos)[0]
-        value_length = struct.unpack_from('<H', self.data, pos + 2)[0]
+        key_length, value_length = BNode._U16U16.unpack_from(self._data, pos)
 
-        # Guard clause to handle zero-length values
-        if value_length == 0:
-            return b''
-
-        return self.data[pos + 4 + key_length : pos + 4 + key_length + value_length]
+        return self._mv[pos + 4 + key_length : pos + 4 + key_length + value_length]
 
     def get_data_end(self) -> int:
         """Returns the total number of meaningful bytes in the node's data."""
-        return self.get_kv_start(self.get_num_keys())  # Last offset is sentinel
+        n_keys = self._refresh_layout()
+        if n_keys == 0:
+            return self._kv_base
+        # Last offset is sentinel
+        return self._kv_base + BNode._U16.unpack_from(self._data, self._ptr_end + 2 * (n_keys - 1))[0]
     
-    def node_lookup(self, key: bytes) -> int:
-        """Performs a bisect-left style lookup for the insertion point of a given key."""
+    def compile_lookup(self) -> bool:
+        """Specializes node_lookup to the node's current keys; returns False if the node is too small.
+
+        A compiled node holds its keys as a tuple plus a copy of the page up to
+        get_data_end() (up to ~4 KiB), and every lookup compares the page against that
+        copy to detect direct writes. This still beats the uncompiled bisect for nodes
+        above LOOKUP_COMPILE_THRESHOLD, but costs that memory for as long as it lives.
+        """
         n_keys = self.get_num_keys()
 
-        if n_keys == 0:
-            return 0  
+        if n_keys <= self.LOOKUP_COMPILE_THRESHOLD:
+            return False
+
+        keys = self._decode_keys()[1:]
 
-        pos = 0  
-        for i in range(1, n_keys):  
-            if self.get_key(i) > key:
-                break
-            pos = i
+        # Keys are sorted, so the prefix shared by the first and last is shared by all
+        prefix_len = _common_prefix_len(keys[0], keys[-1])
+        if prefix_len == 0:
+            keys = tuple(keys)
 
-        return pos
+            def lookup(key: bytes) -> int:
+                return bisect.bisect_right(keys, key)
+        else:
+            prefix = keys[0][:prefix_len]
+            suffixes = tuple(k[prefix_len:] for k in keys)
+
+            def lookup(key: bytes) -> int:
+                if key.startswith(prefix):
+                    return bisect.bisect_right(suffixes, key[prefix_len:])
+                return 0 if key < prefix else len(suffixes)
+
+        # Snapshot the meaningful bytes so writes made directly to node.data are detected
+        self._lookup_page = bytes(self._mv[:self.get_data_end()])
+        self._lookup_fn = lookup
+        return True
+
+    def node_lookup(self, key: bytes) -> int:
+        """Performs a binary search for the last position whose key is <= the given key."""
+        if self._lookup_fn is not None:
+            if self._data.startswith(self._lookup_page):
+                if type(key) is not bytes:
+                    key = bytes(key)  # e.g. a memoryview from get_key()
+                return self._lookup_fn(key)
+            self._invalidate()
+
+        data = self._data
+        unpack_u16 = BNode._U16.unpack_from
+        n_keys = self._refresh_layout()
+
+        if n_keys == 0:
+            return 0
+
+        offsets_base = self._ptr_end
+        kv_base = self._kv_base
+
+        # Bisect over keys 1..n_keys-1; key 0 is always a candidate
+        lo, hi = 1, n_keys
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = kv_base + unpack_u16(data, offsets_base + 2 * (mid - 1))[0]
+            key_length = unpack_u16(data, pos)[0]
+            if data[pos + 4 : pos + 4 + key_length] > key:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        return lo - 1
     
+    def append_kv(self, idx: int, key: bytes, val: bytes, ptr: int = 0) -> None:
+        """Writes the idx-th KV pair and its pointer; pairs before idx must already be in place."""
+        self.set_pointer(idx, ptr)
+
+        pos = self.get_kv_start(idx)
+        kv_size = 4 + len(key) + len(val)
+        assert pos + kv_size <= self.CHECKSUM_OFFSET, "KV data overlaps the checksum field."
+
+        BNode._U16U16.pack_into(self._data, pos, len(key), len(val))
+        self._data[pos + 4 : pos + 4 + len(key)] = key
+        self._data[pos + 4 + len(key) : pos + kv_size] = val
+
+        self.set_offset(idx + 1, self.get_offset(idx) + kv_size)
+
     def leaf_insert(self, old_node, idx: int, key: bytes, val: bytes) -> 'BNode':
         """Inserts a new key-value pair into a leaf node, returning a new BNode instance."""
 
-        new_node = BNode()
-        new_node.write_metadata(NodeType.LEAF.value, old_node.get_num_keys() + 1)
+        new_node = BNode.acquire(zero_fill=False)
+        new_node.write_metadata(NODE_LEAF, old_node.get_num_keys() + 1)
 
-        new_node.append_range(new_node, old_node, 0, 0, idx)
+        old_node.append_range(new_node, 0, 0, idx)
 
         new_node.append_kv(idx, key, val)
 
-        new_node.append_range(new_node, old_node, idx + 1, idx, old_node.get_num_keys() - idx)
+        old_node.append_range(new_node, idx + 1, idx, old_node.get_num_keys() - idx)
 
         return new_node
 
     def append_range(self, new_node, start_new, start_old, num_pairs):
-        assert start_old + num_pairs <= self.get_num_keys()
-        assert start_new + num_pairs <= new_node.get_num_keys()
+        n_old = self._refresh_layout()
+        n_new = new_node._refresh_layout()
+        assert start_old + num_pairs <= n_old
+        assert start_new + num_pairs <= n_new
 
         if num_pairs == 0:
             return
-        
-        # Copy pointers
-        for i in range(num_pairs):
-            new_node.set_pointer(start_new + i, self.get_pointer(start_old + i))
 
-        # Copy offsets
-        start_offset_new = new_node.get_offset(start_new)
-        start_offset_old = self.get_offset(start_old)
+        new_node._invalidate()
+        src = self._mv  # Slicing a memoryview avoids copying the source range
 
-        for i in range(1, num_pairs + 1):  
-            offset = start_offset_new + self.get_offset(start_old + i) - start_offset_old
-            new_node.set_offset(start_new + i, offset)
+        # Copy pointers as one contiguous band
+        pointers_old = self.HEADER_SIZE + (start_old * self.POINTER_SIZE)
+        pointers_new = self.HEADER_SIZE + (start_new * self.POINTER_SIZE)
+        pointers_len = num_pairs * self.POINTER_SIZE
+        new_node._data[pointers_new : pointers_new + pointers_len] = \
+            src[pointers_old : pointers_old + pointers_len]
 
-        # Copy KV data
-        start_kv_old = self.get_kv_start(start_old)
-        end_kv_old = self.get_kv_start(start_old + num_pairs)
-
-        start_kv_new = new_node.get_kv_start(start_new)
-        
-        new_node.data[start_kv_new : start_kv_new + (end_kv_old - start_kv_old)] = \
-            self.data[start_kv_old : end_kv_old]
-        
-    
+        # Copy offsets, rebased onto the destination's starting offset
+        offsets_old = self._ptr_end
+        offsets_new = new_node._ptr_end
 
+        if start_old == 0:
+            old_offsets = (0,) + _u16_array(num_pairs).unpack_from(self._data, offsets_old)
+        else:
+            old_offsets = _u16_array(num_pairs + 1).unpack_from(self._data, offsets_old + 2 * (start_old - 1))
 
+        if start_new == 0:
+            start_offset_new = 0
+        else:
+            start_offset_new = BNode._U16.unpack_from(new_node._data, offsets_new + 2 * (start_new - 1))[0]
 
+        delta = start_offset_new - old_offsets[0]
+        _u16_array(num_pairs).pack_into(new_node._data, offsets_new + 2 * start_new,
+                                        *[offset + delta for offset in old_offsets[1:]])
 
+        # Copy KV data
+        start_kv_old = self._kv_base + old_offsets[0]
+        end_kv_old = self._kv_base + old_offsets[-1]
 
+        start_kv_new = new_node._kv_base + start_offset_new
+        assert start_kv_new + (end_kv_old - start_kv_old) <= self.CHECKSUM_OFFSET, \
+            "KV data overlaps the checksum field."
 
-        
+        new_node._data[start_kv_new : start_kv_new + (end_kv_old - start_kv_old)] = \
+            src[start_kv_old : end_kv_old]
 
 
+_NODE_POOL: list = []  # Released BNodes available for reuse
+_NODE_POOL_LIMIT = 256
+_ZERO_PAGE = bytes(BNode.PAGE_SIZE)
@@ -1,12 +1,19 @@
-from . import BNode
+from .b_node import BNode
 
 class BTree:
     def __init__(self, root_offset: int, loader, allocator, invalidator) -> None:
-        self.root_offset = root_offset   
-        self.load_node = loader          
-        self.create_node = allocator     
-        self.invalidate_node = invalidator 
+        self.root_offset = root_offset
+        self.load_node = loader
+        self.create_node = allocator
+        self.invalidate_node = invalidator
 
-        root: BNode = self.load_node(root_offset)
-        new_root: BNode = self.create_node(root_offset)
-        self.invalidate_node(root_offset)
\ No newline at end of file
+        self._root = None  # Loaded on first access
+        self._root_loaded_at = None  # root_offset that _root was loaded from
+
+    @property
+    def root(self) -> BNode:
+        """Returns the root node, reloading it whenever root_offset has changed."""
+        if self._root is None or self._root_loaded_at != self.root_offset:
+            self._root = self.load_node(self.root_offset)
+            self._root_loaded_at = self.root_offset
+        return self._root
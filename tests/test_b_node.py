@@ -0,0 +1,329 @@
+import struct
+
+import pytest
+
+from data_structures import b_node
+from data_structures.b_node import BNode, NODE_INTERNAL, NODE_LEAF
+
+
+@pytest.fixture(autouse=True)
+def empty_node_pool():
+    """Isolates each test from nodes other tests left in the module-level pool."""
+    saved = b_node._NODE_POOL[:]
+    b_node._NODE_POOL.clear()
+    yield
+    b_node._NODE_POOL[:] = saved
+
+
+def build_node(keys, vals, ptrs=None, node_type=NODE_LEAF) -> BNode:
+    """Encodes sorted KV pairs directly into a page, independently of BNode's writers."""
+    n = len(keys)
+    ptrs = ptrs if ptrs is not None else [0] * n
+    node = BNode()
+    struct.pack_into('<HH', node.data, 0, node_type, n)
+
+    for i, ptr in enumerate(ptrs):
+        struct.pack_into('<Q', node.data, BNode.HEADER_SIZE + 8 * i, ptr)
+
+    offsets_base = BNode.HEADER_SIZE + 8 * n
+    kv_base = offsets_base + 2 * n
+    offset = 0
+    for i, (key, val) in enumerate(zip(keys, vals)):
+        pos = kv_base + offset
+        struct.pack_into('<HH', node.data, pos, len(key), len(val))
+        node.data[pos + 4 : pos + 4 + len(key) + len(val)] = key + val
+        offset += 4 + len(key) + len(val)
+        struct.pack_into('<H', node.data, offsets_base + 2 * i, offset)
+
+    return node
+
+
+def reference_lookup(keys, key) -> int:
+    pos = 0
+    for i in range(1, len(keys)):
+        if keys[i] > key:
+            break
+        pos = i
+    return pos
+
+
+KEYS = [b''] + [b'key%03d' % i for i in range(1, 40)]
+VALS = [b'v' * (i % 7) for i in range(len(KEYS))]
+PTRS = [1000 + i for i in range(len(KEYS))]
+
+
+# === APPEND RANGE ===
+@pytest.mark.parametrize('start_new, start_old, num_pairs', [
+    (0, 0, 10),
+    (0, 5, 10),
+    (3, 0, 10),
+    (3, 5, 10),
+    (0, 0, len(KEYS)),
+])
+def test_append_range_rebases_offsets(start_new, start_old, num_pairs):
+    old = build_node(KEYS, VALS, PTRS)
+    prefix = start_new
+
+    # Destination starts with 'prefix' pairs of its own, then receives the copied range
+    new = build_node(KEYS[:prefix] + [b''] * num_pairs, VALS[:prefix] + [b''] * num_pairs)
+    old.append_range(new, start_new, start_old, num_pairs)
+
+    for i in range(num_pairs):
+        assert bytes(new.get_key(start_new + i)) == KEYS[start_old + i]
+        assert bytes(new.get_value(start_new + i)) == VALS[start_old + i]
+        assert new.get_pointer(start_new + i) == PTRS[start_old + i]
+
+    for i in range(prefix):
+        assert bytes(new.get_key(i)) == KEYS[i]
+
+
+def test_append_range_split_round_trip():
+    old = build_node(KEYS, VALS, PTRS)
+    half = len(KEYS) // 2
+
+    left, right = BNode(), BNode()
+    left.write_metadata(NODE_LEAF, half)
+    right.write_metadata(NODE_LEAF, len(KEYS) - half)
+    old.append_range(left, 0, 0, half)
+    old.append_range(right, 0, half, len(KEYS) - half)
+
+    assert [bytes(left.get_key(i)) for i in range(half)] == KEYS[:half]
+    assert [bytes(right.get_key(i)) for i in range(len(KEYS) - half)] == KEYS[half:]
+    assert [bytes(right.get_value(i)) for i in range(len(KEYS) - half)] == VALS[half:]
+
+    def kv_size(node):
+        return node.get_data_end() - node.get_kv_start(0)
+
+    assert kv_size(left) + kv_size(right) == kv_size(old)
+
+
+# === LOOKUP ===
+PROBES = KEYS + [b'a', b'key', b'key000', b'key0105', b'key999', b'zzz']
+
+
+@pytest.mark.parametrize('probe', PROBES)
+def test_node_lookup_matches_linear_scan(probe):
+    node = build_node(KEYS, VALS)
+    assert node.node_lookup(probe) == reference_lookup(KEYS, probe)
+
+
+@pytest.mark.parametrize('probe', PROBES)
+def test_compiled_lookup_matches_uncompiled(probe):
+    plain = build_node(KEYS, VALS)
+    compiled = build_node(KEYS, VALS)
+    assert compiled.compile_lookup()
+
+    assert compiled.node_lookup(probe) == plain.node_lookup(probe)
+
+
+@pytest.mark.parametrize('wrap', [memoryview, bytearray])
+def test_compiled_lookup_accepts_same_key_types_as_uncompiled(wrap):
+    plain = build_node(KEYS, VALS)
+    compiled = build_node(KEYS, VALS)
+    assert compiled.compile_lookup()
+
+    for probe in PROBES + [bytes(plain.get_key(5))]:
+        assert compiled.node_lookup(wrap(probe)) == plain.node_lookup(wrap(probe))
+    assert compiled.node_lookup(plain.get_key(5)) == plain.node_lookup(plain.get_key(5)) == 5
+
+
+def test_compiled_lookup_without_shared_prefix_accepts_memoryview_keys():
+    keys = [b''] + [bytes([97 + i % 26]) + b'%02d' % i for i in range(1, 30)]
+    keys.sort()
+    plain = build_node(keys, [b''] * len(keys))
+    compiled = build_node(keys, [b''] * len(keys))
+    assert compiled.compile_lookup()
+
+    for i in range(len(keys)):
+        assert compiled.node_lookup(plain.get_key(i)) == plain.node_lookup(plain.get_key(i)) == i
+    for probe in [b'', b'a', b'm5', b'zz']:
+        assert compiled.node_lookup(memoryview(probe)) == reference_lookup(keys, probe)
+
+
+def test_compile_lookup_skips_small_nodes():
+    node = build_node(KEYS[:BNode.LOOKUP_COMPILE_THRESHOLD], VALS[:BNode.LOOKUP_COMPILE_THRESHOLD])
+    assert not node.compile_lookup()
+
+
+# === NODE TYPE ===
+def test_node_type_checks():
+    node = BNode()
+    node.write_metadata(NODE_LEAF, 0)
+    assert node.is_leaf() and not node.is_internal()
+
+    node.write_metadata(NODE_INTERNAL, 0)
+    assert node.is_internal() and not node.is_leaf()
+
+
+def test_compiled_lookup_detects_direct_page_writes():
+    node = build_node(KEYS, VALS, PTRS)
+    assert node.compile_lookup()
+
+    # Same nkeys, different keys and pointers, written straight into the page
+    other_keys = [b''] + [b'z%03d' % i for i in range(1, len(KEYS))]
+    other = build_node(other_keys, VALS, [999] * len(KEYS))
+    node.data[:] = other.data
+
+    assert node.get_pointer(3) == 999
+    assert node.node_lookup(b'z010') == 10
+    assert node.node_lookup(b'z010') == reference_lookup(other_keys, b'z010')
+
+
+def test_reassigning_data_rebinds_views_and_layout():
+    node = build_node(KEYS, VALS, PTRS)
+    node.compile_lookup()
+    node.update_checksum()
+
+    other_keys = [b'', b'a', b'b']
+    other = build_node(other_keys, [b'x', b'yy', b'zzz'], [7, 8, 9])
+    node.data = bytearray(other.data)
+
+    assert node.get_num_keys() == 3
+    assert bytes(node.get_key(1)) == b'a'
+    assert bytes(node.get_value(2)) == b'zzz'
+    assert node.get_pointer(2) == 9
+    assert node.get_data_end() == other.get_data_end()
+    assert node.node_lookup(b'b') == reference_lookup(other_keys, b'b')
+    assert node.compute_checksum() == other.compute_checksum()
+
+    new = BNode()
+    new.write_metadata(NODE_LEAF, 3)
+    node.append_range(new, 0, 0, 3)
+    assert [bytes(new.get_key(i)) for i in range(3)] == other_keys
+
+
+
+def test_get_header_matches_individual_fields():
+    node = BNode()
+    node.write_metadata(NODE_INTERNAL, 17)
+    assert node.get_header() == (node.get_node_type(), node.get_num_keys()) == (NODE_INTERNAL, 17)
+
+    node = build_node(KEYS, VALS)
+    assert node.get_header() == (node.get_node_type(), node.get_num_keys()) == (NODE_LEAF, len(KEYS))
+
+
+# === LAYOUT ===
+def test_layout_follows_nkeys_changed_by_write_metadata():
+    node = build_node(KEYS[:5], VALS[:5])
+    assert node.get_kv_start(0) == BNode.HEADER_SIZE + 5 * (BNode.POINTER_SIZE + 2)
+
+    node.write_metadata(NODE_LEAF, 3)
+    assert node.get_kv_start(0) == BNode.HEADER_SIZE + 3 * (BNode.POINTER_SIZE + 2)
+    assert node.get_data_end() == node.get_kv_start(3)
+
+
+def test_layout_follows_nkeys_changed_by_page_write():
+    node = build_node(KEYS[:5], VALS[:5])
+    before = node.get_data_end()  # Populates the layout cache for nkeys == 5
+
+    other = build_node(KEYS[:9], VALS[:9])
+    node.data[:] = other.data
+    assert node.get_kv_start(0) == other.get_kv_start(0)
+    assert node.get_kv_start(4) == other.get_kv_start(4)
+    assert node.get_data_end() == other.get_data_end() != before
+
+
+# === CHECKSUM ===
+def test_checksum_round_trip_and_corruption():
+    node = build_node(KEYS, VALS, PTRS)
+    node.update_checksum()
+    assert node.verify_checksum()
+
+    node.data[BNode.HEADER_SIZE] ^= 0xFF
+    assert not node.verify_checksum()
+
+
+def _page_ending_at(data_end: int) -> BNode:
+    """Builds a two-pair node whose KV data ends exactly at 'data_end'."""
+    kv_base = BNode.HEADER_SIZE + 2 * (BNode.POINTER_SIZE + 2)
+    val_size = data_end - kv_base - 2 * 4 - 1 - 2000
+    return build_node([b'', b'k'], [b'a' * 2000, b'b' * val_size])
+
+
+def test_checksum_fits_page_filled_to_checksum_field():
+    node = _page_ending_at(BNode.CHECKSUM_OFFSET)
+    assert node.get_data_end() == BNode.CHECKSUM_OFFSET
+    value = bytes(node.get_value(1))
+
+    node.update_checksum()
+    assert node.verify_checksum()
+    assert bytes(node.get_value(1)) == value
+
+
+def test_checksum_rejects_kv_data_in_checksum_field():
+    node = _page_ending_at(BNode.CHECKSUM_OFFSET + 2)
+    with pytest.raises(AssertionError):
+        node.update_checksum()
+
+
+def test_append_range_rejects_kv_data_in_checksum_field():
+    old = _page_ending_at(BNode.CHECKSUM_OFFSET + 2)
+    new = BNode()
+    new.write_metadata(NODE_LEAF, 2)
+    with pytest.raises(AssertionError):
+        old.append_range(new, 0, 0, 2)
+
+
+# === POOLING ===
+def test_acquire_reuses_released_node_zeroed():
+    node = BNode.acquire()
+    node.data[10] = 7
+    node.release()
+
+    reused = BNode.acquire()
+    assert reused is node
+    assert reused.data[10] == 0
+    reused.release()
+
+
+def test_double_release_does_not_hand_out_shared_pages():
+    node = BNode.acquire()
+    node.release()
+    with pytest.raises(AssertionError):
+        node.release()
+
+    first, second = BNode.acquire(), BNode.acquire()
+    assert first is not second
+    first.release()
+    second.release()
+
+
+# === LEAF INSERT ===
+@pytest.mark.parametrize('idx', [0, 1, 20, len(KEYS)])
+def test_leaf_insert_places_pair_and_shifts_the_rest(idx):
+    old = build_node(KEYS, VALS, PTRS)
+    new = old.leaf_insert(old, idx, b'inserted', b'value')
+
+    keys = KEYS[:idx] + [b'inserted'] + KEYS[idx:]
+    vals = VALS[:idx] + [b'value'] + VALS[idx:]
+    assert new.is_leaf()
+    assert new.get_num_keys() == len(KEYS) + 1
+    assert [bytes(new.get_key(i)) for i in range(len(keys))] == keys
+    assert [bytes(new.get_value(i)) for i in range(len(vals))] == vals
+    assert [new.get_pointer(i) for i in range(len(keys))] == PTRS[:idx] + [0] + PTRS[idx:]
+
+
+def test_leaf_insert_allocates_from_the_pool():
+    pooled = BNode.acquire()
+    pooled.release()
+
+    old = build_node(KEYS, VALS, PTRS)
+    assert old.leaf_insert(old, 1, b'a', b'b') is pooled
+
+
+def test_leaf_insert_on_dirty_reused_page():
+    dirty = BNode.acquire()
+    dirty.data[:] = b'\xff' * BNode.PAGE_SIZE
+    dirty.release()
+
+    old = build_node(KEYS, VALS, PTRS)
+    new = old.leaf_insert(old, 20, b'key019a', b'value')
+    assert new is dirty
+    assert new.data[new.get_data_end()] == 0xFF  # Trailing bytes were not zero-filled
+
+    keys = KEYS[:20] + [b'key019a'] + KEYS[20:]
+    vals = VALS[:20] + [b'value'] + VALS[20:]
+    assert [bytes(new.get_key(i)) for i in range(len(keys))] == keys
+    assert [bytes(new.get_value(i)) for i in range(len(vals))] == vals
+    assert [new.get_pointer(i) for i in range(len(keys))] == PTRS[:20] + [0] + PTRS[20:]
+    assert new.node_lookup(b'key030') == keys.index(b'key030')
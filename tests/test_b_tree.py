@@ -0,0 +1,30 @@
+from data_structures.b_node import BNode
+from data_structures.b_tree import BTree
+
+
+def make_tree(pages):
+    loads = []
+
+    def loader(offset):
+        loads.append(offset)
+        return pages[offset]
+
+    return BTree(0, loader, lambda offset: BNode(), lambda offset: None), loads
+
+
+def test_root_is_loaded_lazily_and_cached():
+    tree, loads = make_tree({0: BNode()})
+    assert loads == []
+
+    assert tree.root is tree.root
+    assert loads == [0]
+
+
+def test_root_reloads_after_root_offset_changes():
+    pages = {0: BNode(), 4096: BNode()}
+    tree, loads = make_tree(pages)
+    assert tree.root is pages[0]
+
+    tree.root_offset = 4096
+    assert tree.root is pages[4096]
+    assert loads == [0, 4096]